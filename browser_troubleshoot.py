@@ -1,39 +1,60 @@
-import os
+import re
 import subprocess
 import time
-from datetime import datetime
 from seleniumbase import Driver
 from selenium.common.exceptions import WebDriverException, SessionNotCreatedException
 
 # --- Configuration ---
 RESULTS_FILE = "browser_troubleshoot_results.txt"
 
+# Pre-launch checks as (description, shell command); all run in a single shell
+DIAGNOSTIC_COMMANDS = [
+    ("Chromium Browser Version", "chromium-browser --version"),
+    # SeleniumBase often uses Xvfb automatically; this is a common way to check for it.
+    ("Check for Xvfb process", "pgrep -l Xvfb"),
+    ("DISPLAY environment variable", 'echo "${DISPLAY:-Not set}"'),
+]
+
 # --- Script Logic ---
+_ts_cache = [0, ""]  # [epoch second, formatted timestamp]
+
 def log_message(message, file_handle=None):
     """Logs a message to console and optionally to a file."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[0] = now
+        _ts_cache[1] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+    timestamp = _ts_cache[1]
     full_message = f"[{timestamp}] {message}"
     print(full_message)
     if file_handle:
         file_handle.write(full_message + "\n")
 
-def run_command(command, description, file_handle):
-    """Runs a shell command and logs its output."""
-    log_message(f"--- Running command: {description} ({' '.join(command)}) ---", file_handle)
+def run_diagnostics(file_handle):
+    """Runs all diagnostic commands in one shell and logs each command's output."""
+    # Each command is followed by a marker line carrying its exit code; the leading newline keeps the
+    # marker on its own line even when the output doesn't end with one (stripped again below)
+    script = "".join(f"{command} 2>&1; printf '\\n--- exit %s\\n' $?\n" for _, command in DIAGNOSTIC_COMMANDS)
     try:
-        process = subprocess.run(command, capture_output=True, text=True, check=False)
-        log_message(f"Command STDOUT:\n{process.stdout.strip()}", file_handle)
-        if process.stderr:
-            log_message(f"Command STDERR:\n{process.stderr.strip()}", file_handle)
-        log_message(f"Command exited with code: {process.returncode}", file_handle)
-        return process.returncode == 0
-    except FileNotFoundError:
-        log_message(f"Error: Command '{command[0]}' not found.", file_handle)
-        return False
+        process = subprocess.run(["sh", "-c", script], capture_output=True, text=True, check=False)
     except Exception as e:
-        log_message(f"Error running command: {e}", file_handle)
+        log_message(f"Error running diagnostics: {e}", file_handle)
         return False
 
+    # re.split with one group yields [output, code, output, code, ..., trailing]
+    parts = re.split(r"^--- exit (\d+)$", process.stdout, flags=re.MULTILINE)
+    all_ok = len(parts) // 2 == len(DIAGNOSTIC_COMMANDS)
+    if not all_ok:
+        log_message(f"Expected {len(DIAGNOSTIC_COMMANDS)} exit markers, found {len(parts) // 2}:\n{process.stdout}", file_handle)
+    for (description, command), output, code in zip(DIAGNOSTIC_COMMANDS, parts[0::2], parts[1::2]):
+        log_message(f"--- Running command: {description} ({command}) ---", file_handle)
+        log_message(f"Command output:\n{output.strip()}", file_handle)
+        log_message(f"Command exited with code: {code}", file_handle)
+        all_ok = all_ok and code == "0"
+    if process.stderr:
+        log_message(f"Shell STDERR:\n{process.stderr.strip()}", file_handle)
+    return all_ok
+
 def troubleshoot_browser_launch():
     """Attempts to launch SeleniumBase browser and troubleshoots if it fails."""
     with open(RESULTS_FILE, 'w') as f_results:
@@ -41,16 +62,7 @@ def troubleshoot_browser_launch():
 
         # --- Diagnostic Checks ---
         log_message("Performing pre-launch diagnostic checks...", f_results)
-        
-        # Check Chromium version
-        run_command(["chromium-browser", "--version"], "Chromium Browser Version", f_results)
-        
-        # Check if Xvfb (virtual display) is running (SeleniumBase often uses it automatically)
-        # This command might vary, but this is a common way to check for Xvfb processes.
-        run_command(["pgrep", "-l", "Xvfb"], "Check for Xvfb process", f_results)
-
-        # Check display environment variable
-        log_message(f"DISPLAY environment variable: {os.environ.get('DISPLAY', 'Not set')}", f_results)
+        run_diagnostics(f_results)
 
         # --- Attempt Browser Launch ---
         log_message("\nAttempting to initialize SeleniumBase Driver...", f_results)
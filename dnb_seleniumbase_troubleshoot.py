@@ -1,267 +1,727 @@
+import configparser
+import contextlib
+import getpass
+import io
+import itertools
+import json
 import os
+import sys
+import tempfile
+import threading
 import time
 import subprocess
 import random
-from datetime import datetime
+import shutil
+import socket
+import string
+import zipfile
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from seleniumbase import BaseCase
 from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.support.expected_conditions import staleness_of
+from selenium.webdriver.support.ui import WebDriverWait
+
+try:
+    from PIL import Image  # Optional: re-encode screenshots as JPEG
+except ImportError:
+    Image = None
 
 # Configuration
 DNB_HOME_URL = "https://www.dnb.com/"
+DNB_ROBOTS_URL = "https://www.dnb.com/robots.txt"  # Reachability pre-check before using the browser
 TARGET_DNB_URL = "https://www.dnb.com/business-directory/company-information.oil_and_gas_extraction.ca.html?page=3"
 RESULTS_FILE = "dnb_playwright_troubleshoot_results.txt"  # Keep name for workflow compatibility
 SCREENSHOT_DIR = "playwright_troubleshoot_screenshots"
 HTML_DUMP_DIR = "playwright_troubleshoot_html_dumps"
+HTTP_CACHE_DIR = os.path.abspath("firefox_http_cache")  # Survives runs (and is cached by the workflow)
 WIREGUARD_CONFIG_FILES_TO_TEST = ["ch-zrh-wg-001.conf", "us-phx-wg-101.conf", "us-sjc-wg-002.conf"]
+CONFIG_PATHS = {c: os.path.abspath(c) for c in WIREGUARD_CONFIG_FILES_TO_TEST}  # Resolved once, immune to later chdir
+STOP_ON_SUCCESS = os.environ.get("DNB_STOP_ON_SUCCESS") == "1"  # Stop at the first VPN that loads both pages unblocked
+MAX_VPNS = int(os.environ.get("DNB_MAX_VPNS", len(WIREGUARD_CONFIG_FILES_TO_TEST)))  # Cap on VPNs tried
+PARALLEL_VPNS = os.environ.get("DNB_PARALLEL_VPNS") == "1"  # All VPNs at once, one network namespace each
+SIMULATE_HUMAN = os.environ.get("DNB_SIMULATE_HUMAN") == "1"  # Long delays plus mouse/scroll simulation; off = short delays only
+
+# Block detection (one combined query = one lookup per page)
+CAPTCHA_SELECTOR = 'iframe[src*="recaptcha"], #cf-wrapper, [data-hcaptcha-widget-id]'
+# Same markers plus the "Access Denied" heading; XPath because CSS has no :contains()
+BLOCK_XPATH = (
+    '//iframe[contains(@src, "recaptcha")] | //*[@id="cf-wrapper"]'
+    ' | //*[@data-hcaptcha-widget-id] | //h1[contains(., "Access Denied")]'
+)
+# Title and block flag in one round trip; a node-set cast to boolean is true when non-empty
+PAGE_PROBE_JS = (
+    "return [document.title,"
+    " document.evaluate(arguments[0], document, null, XPathResult.BOOLEAN_TYPE, null).booleanValue];"
+)
+
+# Elements that mean a page is usable (or blocked), so we don't wait for trackers to finish loading
+HOME_READY_SELECTOR = f'input[name="q"], input#searchTerm, {CAPTCHA_SELECTOR}'
+TARGET_READY_SELECTOR = f'a[href*="/business-directory/company-profiles"], {CAPTCHA_SELECTOR}'
+
+@dataclass(frozen=True, slots=True)
+class PageCheck:
+    """One DNB page to visit: where its status goes, how to tell it loaded, and its artifact names."""
+    key: str  # result dict key, also used in log lines ("home", "target")
+    label: str  # results file label
+    url: str
+    ready_selector: str
+    artifact_prefix: str
+
+HOME_PAGE = PageCheck("home", "Home Page", DNB_HOME_URL, HOME_READY_SELECTOR, "dnb_home")
+TARGET_PAGE = PageCheck("target", "Target Page", TARGET_DNB_URL, TARGET_READY_SELECTOR, "dnb_target")
+
+# Stealth script to mimic human browser. $-placeholders are filled once per browser by
+# _stealth_js(), so the getters return constants instead of re-rolling on every access.
+# It ships as a content script (_write_stealth_addon) because overrides set with
+# execute_script are gone after the next navigation.
+_STEALTH_JS = string.Template("""
+(() => {  // Scoped, so the helpers below can't collide with the page's own globals
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    Object.defineProperty(window, 'chrome', { get: () => undefined });
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [
+            { name: 'PDF Viewer', filename: 'internal-pdf-viewer', description: 'Portable Document Format', length: 1 },
+            { name: 'Widevine CDM', filename: 'widevinecdm.dll', description: 'Enables secure playback', length: 1 },
+        ],
+    });
+    Object.defineProperty(navigator, 'mimeTypes', {
+        get: () => [{ type: 'application/pdf', suffixes: 'pdf', description: 'Portable Document Format', enabledPlugin: navigator.plugins[0] }],
+    });
+    Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
+    Object.defineProperty(navigator, 'hardwareConcurrency', { get: () => $hw_concurrency });
+    Object.defineProperty(navigator, 'deviceMemory', { get: () => $device_memory });
+    Object.defineProperty(window, 'outerWidth', { get: () => window.innerWidth });
+    Object.defineProperty(window, 'outerHeight', { get: () => window.innerHeight });
+    Object.defineProperty(navigator, 'platform', { get: () => '$platform' });
+    console.debug = () => {};
+
+    const getParameter = WebGLRenderingContext.prototype.getParameter;
+    WebGLRenderingContext.prototype.getParameter = function(parameter) {
+        if (parameter === 37445) return 'Mozilla';
+        if (parameter === 37446) return '$webgl_renderer';
+        return getParameter.apply(this, arguments);
+    };
+
+    const noise = new Int8Array([$canvas_noise]);  // Per-pixel jitter from a fixed lookup table
+    const getContext = HTMLCanvasElement.prototype.getContext;
+    HTMLCanvasElement.prototype.getContext = function(type) {
+        if (type === '2d') {
+            const ctx = getContext.apply(this, arguments);
+            const originalGetImageData = ctx.getImageData;
+            ctx.getImageData = function(x, y, w, h) {
+                const data = originalGetImageData.apply(this, arguments);
+                const pixels = data.data;
+                for (let i = 0; i < pixels.length; i += 4) pixels[i] += noise[(i >> 2) & 255];
+                return data;
+            };
+            return ctx;
+        }
+        return getContext.apply(this, arguments);
+    };
+
+    Object.defineProperty(navigator, 'connection', {
+        get: () => ({
+            effectiveType: '4g',
+            rtt: $rtt,
+            downlink: $downlink,
+            saveData: false,
+        }),
+    });
+
+    Object.defineProperty(window, 'screen', {
+        get: () => ({
+            width: $screen_width,
+            height: $screen_height,
+            availWidth: $screen_width,
+            availHeight: $screen_height,
+            colorDepth: 24,
+            pixelDepth: 24,
+        }),
+    });
+})();
+""")
 
-# Ensure directories
-os.makedirs(SCREENSHOT_DIR, exist_ok=True)
-os.makedirs(HTML_DUMP_DIR, exist_ok=True)
+def _stealth_js(platform, width, height):
+    """Specializes the stealth script with values picked once.
+
+    platform must match the user agent, and width/height the browser window, so the spoofed values agree.
+    """
+    return _STEALTH_JS.substitute(
+        screen_width=width,
+        screen_height=height,
+        hw_concurrency=random.choice([4, 8, 12]),
+        device_memory=random.choice([4, 8, 16]),
+        platform=platform,
+        webgl_renderer=random.choice(['ANGLE (NVIDIA GeForce RTX 3060)', 'ANGLE (Intel Iris Xe)', 'ANGLE (AMD Radeon)']),
+        canvas_noise=",".join(str(random.randint(-1, 1)) for _ in range(256)),
+        rtt=random.randint(50, 99),
+        downlink=round(random.uniform(4, 8), 2),
+    )
+
+def _write_stealth_addon(directory, script):
+    """Writes a temporary add-on that runs script in every DNB page before the page's own scripts."""
+    addon_dir = os.path.join(directory, "stealth_addon")
+    os.makedirs(addon_dir, exist_ok=True)
+    manifest = {
+        "manifest_version": 2,
+        "name": "dnb-stealth",
+        "version": "1.0",
+        "browser_specific_settings": {"gecko": {"id": "dnb-stealth@localhost"}},
+        # MAIN world: the overrides must land on the page's navigator/window, not the add-on's sandbox
+        "content_scripts": [
+            {"matches": ["*://*.dnb.com/*"], "js": ["stealth.js"], "run_at": "document_start", "world": "MAIN"},
+        ],
+    }
+    with open(os.path.join(addon_dir, "manifest.json"), 'w') as f:
+        json.dump(manifest, f)
+    with open(os.path.join(addon_dir, "stealth.js"), 'w') as f:
+        f.write(script)
+    return addon_dir
 
 # Logging
+_ts_cache = [0, ""]  # [epoch second, formatted timestamp]
+
 def log_message(message, file_handle=None):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{timestamp}] {message}")
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[0] = now
+        _ts_cache[1] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+    line = f"[{_ts_cache[1]}] {message}\n"
+    # One write per line: print() writes the newline separately, so I/O-pool threads could interleave
+    sys.stdout.write(line)
     if file_handle:
-        file_handle.write(f"[{timestamp}] {message}\n")
+        file_handle.write(line)
 
 # Screenshots and HTML dumps
-def take_screenshot(driver, filename_prefix, config_file_name, file_handle):
-    screenshot_name = f"{config_file_name.replace('.conf', '')}_{filename_prefix}_{datetime.now().strftime('%H%M%S')}.png"
+# The browser is only needed to capture bytes; writing them to disk happens in the background
+_IO_POOL = ThreadPoolExecutor(max_workers=2)
+
+def _write_bytes(path, data):
+    try:
+        with open(path, 'wb') as f:
+            f.write(data)
+    except OSError as e:
+        log_message(f"Artifact write error {path}: {e}")
+
+def _write_screenshot(path, png):
+    if Image is None:
+        _write_bytes(path, png)
+        return
+    try:
+        # Viewport JPEG is a fraction of the PNG size and these are diagnostics only
+        Image.open(io.BytesIO(png)).convert("RGB").save(path, "JPEG", quality=60)
+    except OSError as e:
+        log_message(f"Artifact write error {path}: {e}")
+
+# Appended to artifact names so two captures in the same second never collide
+_ARTIFACT_SEQ = itertools.count()
+
+# HTML dumps go into one deflated zip per config (pages are large and compress well even at level 1)
+_HTML_ZIPS = {}
+_HTML_ZIPS_LOCK = threading.Lock()
+
+def _write_html_entry(config_name, name, data):
+    try:
+        with _HTML_ZIPS_LOCK:
+            archive = _HTML_ZIPS.get(config_name)
+            if archive is None:
+                archive = _HTML_ZIPS[config_name] = zipfile.ZipFile(
+                    os.path.join(HTML_DUMP_DIR, f"{config_name}.zip"), 'w', zipfile.ZIP_DEFLATED, compresslevel=1)
+            archive.writestr(name, data)
+    except OSError as e:
+        log_message(f"Artifact write error {config_name}.zip/{name}: {e}")
+
+def _close_html_zips():
+    with _HTML_ZIPS_LOCK:
+        for archive in _HTML_ZIPS.values():
+            archive.close()
+        _HTML_ZIPS.clear()
+
+def take_screenshot(driver, filename_prefix, config_name, file_handle):
+    extension = "png" if Image is None else "jpg"
+    screenshot_name = f"{config_name}_{filename_prefix}_{time.strftime('%H%M%S')}_{next(_ARTIFACT_SEQ)}.{extension}"
     screenshot_path = os.path.join(SCREENSHOT_DIR, screenshot_name)
     try:
-        driver.save_screenshot(screenshot_path)
+        png = driver.get_screenshot_as_png()
+        _IO_POOL.submit(_write_screenshot, screenshot_path, png)
         log_message(f"Screenshot: {screenshot_path}", file_handle)
     except Exception as e:
         log_message(f"Screenshot error {screenshot_name}: {e}", file_handle)
 
-def dump_html_content(driver, filename_prefix, config_file_name, file_handle):
-    html_dump_name = f"{config_file_name.replace('.conf', '')}_{filename_prefix}_{datetime.now().strftime('%H%M%S')}.html"
-    html_dump_path = os.path.join(HTML_DUMP_DIR, html_dump_name)
+def dump_html_content(driver, filename_prefix, config_name, file_handle):
+    html_dump_name = f"{config_name}_{filename_prefix}_{time.strftime('%H%M%S')}_{next(_ARTIFACT_SEQ)}.html"
     try:
-        content = driver.get_page_source()
-        with open(html_dump_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        log_message(f"HTML dumped: {html_dump_path}", file_handle)
+        content = driver.execute_script("return document.documentElement.outerHTML;")
+        # ZipFile.writestr() encodes str as UTF-8 itself, so the copy is made on the pool thread
+        _IO_POOL.submit(_write_html_entry, config_name, html_dump_name, content)
+        log_message(f"HTML dumped: {os.path.join(HTML_DUMP_DIR, config_name + '.zip')}/{html_dump_name}", file_handle)
+        return content  # Callers reuse it instead of fetching the page source again
     except Exception as e:
         log_message(f"HTML dump error {html_dump_name}: {e}", file_handle)
+        return None
 
 # VPN management
+TUNNEL_WAIT_SECONDS = 3  # Upper bound on waiting for the first request through a fresh tunnel
+
+def _wait_for_tunnel(interface):
+    """Polls a tiny request bound to the tunnel interface until one gets an answer."""
+    deadline = time.monotonic() + TUNNEL_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        probe = subprocess.run(
+            ['curl', '-s', '-o', '/dev/null', '--head', '--max-time', '1', '--interface', interface, 'https://1.1.1.1'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        if probe.returncode == 0:
+            return True
+        time.sleep(0.25)
+    return False
+
 def bring_up_vpn(config_file, file_handle):
-    config_path = os.path.join(os.getcwd(), config_file)
+    config_path = CONFIG_PATHS[config_file]
     log_message(f"Starting VPN '{config_file}'...", file_handle)
     up_command = ['sudo', 'wg-quick', 'up', config_path]
     try:
-        subprocess.run(up_command, capture_output=True, text=True, check=True, timeout=10)
-        log_message(f"VPN '{config_file}' up. Waiting 3s...", file_handle)
-        time.sleep(3)
+        subprocess.run(up_command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True, timeout=10)
+        started = time.monotonic()
+        # wg-quick names the interface after the config file
+        if _wait_for_tunnel(os.path.splitext(config_file)[0]):
+            log_message(f"VPN '{config_file}' up; traffic flowing after {time.monotonic() - started:.2f}s.", file_handle)
+        else:
+            log_message(f"VPN '{config_file}' up; no traffic within {TUNNEL_WAIT_SECONDS}s, continuing.", file_handle)
         return True
     except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
-        log_message(f"VPN error: {e}", file_handle)
+        log_message(f"VPN error: {e} {getattr(e, 'stderr', '') or ''}".rstrip(), file_handle)
         return False
 
 def bring_down_vpn(config_file, file_handle):
-    config_path = os.path.join(os.getcwd(), config_file)
+    config_path = CONFIG_PATHS[config_file]
     log_message(f"Stopping VPN '{config_file}'...", file_handle)
     down_command = ['sudo', 'wg-quick', 'down', config_path]
     try:
-        subprocess.run(down_command, capture_output=True, text=True, check=True, timeout=10)
+        subprocess.run(down_command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True, timeout=10)
         log_message(f"VPN '{config_file}' down.", file_handle)
     except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
-        log_message(f"VPN shutdown error: {e}", file_handle)
+        log_message(f"VPN shutdown error: {e} {getattr(e, 'stderr', '') or ''}".rstrip(), file_handle)
+
+def dnb_reachable(file_handle):
+    """Cheap pre-check: can this egress reach DNB at all?
+
+    Only connection errors, timeouts and 5xx count as unreachable. A 4xx to this non-browser client is
+    DNB's bot filtering, which is exactly what the page checks are there to observe.
+    """
+    try:
+        response = requests.get(DNB_ROBOTS_URL, timeout=5, headers={"User-Agent": "curl/8"})
+    except requests.RequestException as e:
+        log_message(f"Pre-check failed: {type(e).__name__}", file_handle)
+        return False
+    if response.status_code >= 500:
+        log_message(f"Pre-check failed: robots.txt returned HTTP {response.status_code}", file_handle)
+        return False
+    if response.status_code >= 400:
+        log_message(f"Pre-check: robots.txt returned HTTP {response.status_code}; continuing with the browser.", file_handle)
+    return True
+
+# Network namespaces (parallel mode)
+# Each VPN gets a namespace whose only route is its own tunnel, so configs can't see each other's routes
+def _sudo(args, input=None):
+    return subprocess.run(['sudo', *args], input=input, capture_output=True, text=True, check=True, timeout=10)
+
+def setup_vpn_namespace(config_file, index, file_handle):
+    namespace, interface = f"dnb_vpn{index}", f"wgdnb{index}"
+    config_path = CONFIG_PATHS[config_file]
+    log_message(f"Starting VPN '{config_file}' in namespace '{namespace}'...", file_handle)
+    conf = configparser.ConfigParser(strict=False)
+    conf.read(config_path)
+    addresses = [a.strip() for a in conf.get("Interface", "Address").split(",")]
+    dns_servers = [d.strip() for d in conf.get("Interface", "DNS", fallback="").split(",") if d.strip()]
+    try:
+        wg_config = _sudo(['wg-quick', 'strip', config_path]).stdout  # Drop wg-quick-only keys (Address, DNS)
+        _sudo(['ip', 'netns', 'add', namespace])
+        # Created on the host, then moved: the tunnel's UDP socket stays on the host network
+        _sudo(['ip', 'link', 'add', interface, 'type', 'wireguard'])
+        _sudo(['ip', 'link', 'set', interface, 'netns', namespace])
+        _sudo(['ip', 'netns', 'exec', namespace, 'wg', 'setconf', interface, '/dev/stdin'], input=wg_config)
+        for address in addresses:
+            _sudo(['ip', '-n', namespace, 'addr', 'add', address, 'dev', interface])
+        _sudo(['ip', '-n', namespace, 'link', 'set', 'lo', 'up'])
+        _sudo(['ip', '-n', namespace, 'link', 'set', interface, 'up'])
+        _sudo(['ip', '-n', namespace, 'route', 'add', 'default', 'dev', interface])
+        if any(':' in address for address in addresses):
+            _sudo(['ip', '-6', '-n', namespace, 'route', 'add', 'default', 'dev', interface])
+        if dns_servers:
+            # `ip netns exec` bind-mounts this over /etc/resolv.conf
+            _sudo(['mkdir', '-p', f'/etc/netns/{namespace}'])
+            _sudo(['tee', f'/etc/netns/{namespace}/resolv.conf'], input="".join(f"nameserver {d}\n" for d in dns_servers))
+        log_message(f"VPN '{config_file}' up in '{namespace}'.", file_handle)
+        return namespace
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        log_message(f"VPN error: {e} {getattr(e, 'stderr', '') or ''}".rstrip(), file_handle)
+        teardown_vpn_namespace(namespace, file_handle)
+        return None
+
+def teardown_vpn_namespace(namespace, file_handle, wait=True):
+    """Deletes the namespace; with wait=False returns the running Popen so teardowns can overlap."""
+    # Deleting the namespace also deletes the WireGuard interface inside it
+    log_message(f"Removing namespace '{namespace}'...", file_handle)
+    process = subprocess.Popen(
+        ['sudo', 'sh', '-c', f'ip netns del {namespace}; rm -rf /etc/netns/{namespace}'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    if wait:
+        _wait_teardown(process)
+    return process
+
+def _wait_teardown(process):
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
 
 # SeleniumBase test class
 class DNBScraperTest(BaseCase):
+    def _start_browser(self, cache_name="shared", one_tunnel=False):
+        """Launches one stealth Firefox that is shared by every VPN config.
+
+        cache_name picks the HTTP cache subdirectory; concurrent browsers must not share one.
+        one_tunnel says the browser only ever sees one VPN (parallel mode), so DNS answers and
+        pooled connections may be kept.
+        """
+        self._cache_name, self._one_tunnel = cache_name, one_tunnel  # Reused if the browser has to be relaunched
+        user_agents = [  # (user agent, matching navigator.platform)
+            ("Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0", "Win32"),
+            ("Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6; rv:128.0) Gecko/20100101 Firefox/128.0", "MacIntel"),
+            ("Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0", "Linux x86_64"),
+        ]
+        user_agent, platform = random.choice(user_agents)
+        # One size for both the window and the spoofed screen; a mismatch is a known bot signal
+        width, height = random.randint(1280, 1920), random.randint(720, 1080)
+        firefox_options = Options()
+        # Firefox ignores Chromium's --user-agent switch; the pref is what makes the UA match the spoofed platform
+        firefox_options.set_preference("general.useragent.override", user_agent)
+        firefox_options.add_argument(f"--width={width}")
+        firefox_options.add_argument(f"--height={height}")
+        # Return as soon as navigation starts; _check_page waits for the new document, then for its ready selector
+        firefox_options.page_load_strategy = "none"
+        # Throwaway profile on tmpfs: Firefox's SQLite writes never touch the disk (the HTTP cache is set below)
+        self._profile_dir = tempfile.mkdtemp(prefix="dnb_firefox_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        firefox_options.add_argument("-profile")
+        firefox_options.add_argument(self._profile_dir)
+        # The HTTP cache lives outside the throwaway profile, so DNB's static assets are fetched once, not per run
+        firefox_options.set_preference("browser.cache.disk.parent_directory", os.path.join(HTTP_CACHE_DIR, cache_name))
+        # Only the HTML matters here; skip the heavy subresources that crawl over the VPN
+        firefox_options.set_preference("permissions.default.image", 2)
+        firefox_options.set_preference("browser.display.use_document_fonts", 0)
+        firefox_options.set_preference("permissions.default.stylesheet", 2)  # Presence waits and XPath probes don't need CSS
+        firefox_options.set_preference("media.autoplay.default", 5)
+        firefox_options.set_preference("privacy.trackingprotection.enabled", True)  # Ads/analytics (doubleclick, GA, ...)
+        # Social widgets (facebook, twitter, ...) and cryptominers come from separate lists
+        firefox_options.set_preference("privacy.trackingprotection.socialtracking.enabled", True)
+        firefox_options.set_preference("privacy.trackingprotection.cryptomining.enabled", True)
+        firefox_options.set_preference("dom.serviceWorkers.enabled", False)  # No background fetches or install on first visit
+        # No DNS-over-HTTPS: lookups go to the tunnel's resolver and stay inside the VPN
+        firefox_options.set_preference("network.trr.mode", 5)
+        if one_tunnel:
+            # Keep answers for the whole run (one lookup per host, not per minute) and let Firefox prefetch link hosts
+            firefox_options.set_preference("network.dnsCacheExpiration", 3600)
+            firefox_options.set_preference("network.dnsCacheExpirationGracePeriod", 3600)
+            firefox_options.set_preference("network.dns.disablePrefetch", False)
+        else:
+            # A browser shared by every VPN would reuse the first tunnel's geo-DNS answer; resolve per connection
+            # instead, and skip prefetch, whose answers would have nowhere to go
+            firefox_options.set_preference("network.dnsCacheEntries", 0)
+            firefox_options.set_preference("network.dns.disablePrefetch", True)
+        firefox_options.set_preference("network.http.http2.enabled", True)
+        if one_tunnel:
+            # Reuse warm HTTP/2 connections and TLS sessions to DNB between pages instead of re-handshaking over the VPN.
+            # Not in a shared browser: pooled sockets from one tunnel would carry over (and stall) into the next VPN.
+            firefox_options.set_preference("network.http.keep-alive.timeout", 300)
+            firefox_options.set_preference("network.http.max-persistent-connections-per-server", 8)
+        self.set_browser_options(firefox_options)
+        try:
+            self.setUp(browser="firefox")
+        except Exception:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)  # No browser owns it, so _close_browser never will
+            raise
+        # Installed per browser, so the spoofed platform and screen match this launch's user agent and window
+        addon_dir = _write_stealth_addon(self._profile_dir, _stealth_js(platform, width, height))
+        self.driver.install_addon(addon_dir, temporary=True)
+
+    def _close_browser(self, file_handle):
+        self.tearDown()
+        shutil.rmtree(self._profile_dir, ignore_errors=True)
+        log_message("Browser closed.", file_handle)
+
+    def _ensure_browser(self, file_handle):
+        """Relaunches Firefox if it crashed, so one dead browser doesn't fail every remaining config."""
+        try:
+            self.driver.current_window_handle  # Cheap liveness probe
+            return
+        except Exception as e:  # A dead geckodriver surfaces as urllib3/connection errors, not WebDriverException
+            log_message(f"Browser unresponsive ({type(e).__name__}); relaunching.", file_handle)
+        try:
+            self._close_browser(file_handle)
+        except Exception:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)  # Session is already gone; just drop its profile
+        self._start_browser(self._cache_name, self._one_tunnel)
+
+    def _reset_session(self, file_handle):
+        """Drops cookies and storage so the next VPN starts with a fresh identity."""
+        try:
+            self.delete_all_cookies()
+            self.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            self.driver.get("about:blank")
+        except Exception as e:
+            log_message(f"Session reset error: {e}", file_handle)
+
+    def _check_dnb_pages(self, config_name, delay, home_deadline, result, f_results):
+        """Visits the DNB home and target pages, recording their status in result."""
+        # Diagnostic only: logs which DNB edge this tunnel's resolver picks (Firefox does its own lookups).
+        # Runs inside the pre-home delay, so it costs no wall time
+        try:
+            log_message(f"DNS check: www.dnb.com resolves to {socket.gethostbyname('www.dnb.com')} via this VPN.", f_results)
+        except OSError as e:
+            log_message(f"DNS lookup for www.dnb.com failed via this VPN: {e}", f_results)
+
+        # Navigate to DNB Home
+        remaining = max(0.0, home_deadline - time.monotonic())
+        log_message(f"Waiting {remaining:.2f}s of {delay:.2f}s delay for home URL...", f_results)
+        time.sleep(remaining)
+
+        self._check_page(HOME_PAGE, config_name, result, f_results)
+
+        # A clean home load means the session already looks human; go straight to the target
+        if result["home"] == "SUCCESS":
+            log_message("Home page loaded without a block; skipping pre-target simulation.", f_results)
+        else:
+            self._simulate_before_target(f_results)
+
+        self._check_page(TARGET_PAGE, config_name, result, f_results)
+
+    def _simulate_before_target(self, f_results):
+        """Waits out the pre-target delay, simulating mouse and scroll activity meanwhile if SIMULATE_HUMAN."""
+        # The pre-target delay starts now; the behavior simulation counts toward it
+        delay = random.uniform(3, 7) if SIMULATE_HUMAN else random.uniform(1, 3)
+        target_deadline = time.monotonic() + delay
+
+        if SIMULATE_HUMAN:
+            self._simulate_behavior(f_results)
+
+        # Navigate to Target URL
+        remaining = max(0.0, target_deadline - time.monotonic())
+        log_message(f"Waiting {remaining:.2f}s of {delay:.2f}s delay for target URL...", f_results)
+        time.sleep(remaining)
+
+    def _simulate_behavior(self, f_results):
+        """Simulates human-like mouse and scroll activity on the loaded home page."""
+        try:
+            steps = 5
+            log_message(f"Simulating mouse ({steps} steps)...", f_results)
+            # [x, y, pause ms] per step, timed in the page like the scroll below
+            moves = [[random.randint(50, 1200), random.randint(50, 900), random.randint(50, 250)] for _ in range(steps)]
+            self.driver.execute_async_script("""
+                const done = arguments[arguments.length - 1];
+                (async (moves) => {
+                    for (const [x, y, pause] of moves) {
+                        const target = document.elementFromPoint(x, y) || document.body;
+                        target.dispatchEvent(new MouseEvent('mousemove', { clientX: x, clientY: y, bubbles: true }));
+                        await new Promise(resolve => setTimeout(resolve, pause));
+                    }
+                })(arguments[0]).then(() => done(), () => done());
+            """, moves)
+            log_message("Mouse done.", f_results)
+
+            scroll_attempts, scroll_amount_range, scroll_delay_range = 3, (200, 600), (0.5, 2)
+            log_message(f"Simulating scroll ({scroll_attempts} attempts)...", f_results)
+            # [distance px, pause ms] per step; the pauses run in the page, so this is one round trip
+            scroll_steps = [
+                [random.randint(*scroll_amount_range) * random.choice([1, -1]),
+                 int(random.uniform(*scroll_delay_range) * 1000)]
+                for _ in range(scroll_attempts)
+            ]
+            self.driver.execute_async_script("""
+                const done = arguments[arguments.length - 1];
+                (async (steps) => {
+                    for (const [distance, pause] of steps) {
+                        window.scrollBy(0, distance);
+                        await new Promise(resolve => setTimeout(resolve, pause));
+                    }
+                })(arguments[0]).then(() => done(), () => done());
+            """, scroll_steps)
+            log_message("Scroll done.", f_results)
+        except Exception as e:
+            log_message(f"Behavior simulation error: {e}", f_results)
+
+    def _check_page(self, page, config_name, result, f_results):
+        """Loads page.url, records SUCCESS (noting any block) or FAILED in result[page.key]."""
+        log_message(f"Navigating to {page.url}...", f_results)
+        try:
+            old_root = self.driver.find_element("tag name", "html")
+            self.driver.get(page.url)
+            # With the "none" strategy the previous document stays scriptable until the new one commits,
+            # and it may match the ready selector too (e.g. a CAPTCHA-blocked home page before the target)
+            WebDriverWait(self.driver, 15).until(staleness_of(old_root))
+            self.wait_for_element_present(page.ready_selector, timeout=15)
+            title, block_detected = self.execute_script(PAGE_PROBE_JS, BLOCK_XPATH)
+            log_message(f"Navigated to {page.url}. Title: {title}", f_results)
+            # Artifacts are diagnostics: a clean load needs none
+            if block_detected:
+                log_message(f"Block detected on {page.key} page!", f_results)
+                take_screenshot(self.driver, f"{page.artifact_prefix}_block_detected", config_name, f_results)
+                dump_html_content(self.driver, f"{page.artifact_prefix}_page_content", config_name, f_results)
+            result[page.key] = f"SUCCESS{' (Block Detected)' if block_detected else ''}"
+        except Exception as e:
+            log_message(f"Error on {page.url}: {e}", f_results)
+            take_screenshot(self.driver, f"{page.artifact_prefix}_error", config_name, f_results)
+            html = dump_html_content(self.driver, f"{page.artifact_prefix}_error_content", config_name, f_results)
+            if html:
+                log_message(f"Page source snippet:\n{html[:500]}...", f_results)
+            result[page.key] = f"FAILED - {type(e).__name__}"
+        f_results.write(f"  {page.label}: {result[page.key]}\n")
+
+    def _test_one_config(self, config_file, manage_vpn=True):
+        """Runs the home/target checks through one VPN and returns its status and log.
+
+        With manage_vpn=False the tunnel is already up (we run inside its network namespace).
+        """
+        f_results = io.StringIO()
+        result = {"config_file": config_file, "vpn": "UP", "home": None, "target": None}
+        config_name = os.path.splitext(config_file)[0]  # Artifact filename prefix
+        log_message(f"\nTesting VPN: {config_file}", f_results)
+        f_results.write(f"\n--- VPN: {config_file} ---\n")
+
+        # The pre-home delay runs while the VPN settles and the page is prepared
+        delay = random.uniform(5, 10) if SIMULATE_HUMAN else random.uniform(1, 3)
+        home_deadline = time.monotonic() + delay
+
+        with contextlib.ExitStack() as cleanup:
+            if manage_vpn and not bring_up_vpn(config_file, f_results):
+                log_message(f"Skipping {config_file}.", f_results)
+                f_results.write("  VPN Failed.\n")
+                result["vpn"] = "FAILED"
+            else:
+                # Runs in reverse on every exit path: reset the browser session, then take the VPN down
+                if manage_vpn:
+                    cleanup.callback(bring_down_vpn, config_file, f_results)
+                cleanup.callback(self._reset_session, f_results)
+                # Null-routed or edge-blocked egress fails here in seconds, not after two page timeouts
+                if not dnb_reachable(f_results):
+                    result["home"] = result["target"] = "FAILED - PreCheck"
+                    f_results.write("  Pre-check Failed. Skipping page checks.\n")
+                else:
+                    try:
+                        self._ensure_browser(f_results)
+                        self._check_dnb_pages(config_name, delay, home_deadline, result, f_results)
+                    except Exception as e:
+                        log_message(f"Browser error: {e}", f_results)
+                        f_results.write(f"  Status: FAILED - Browser Error\n")
+
+        result["log"] = f_results.getvalue()
+        return result
+
     def troubleshoot_dnb(self):
-        with open(RESULTS_FILE, 'w') as f_results:
+        # Ensure directories (here rather than at import, so importing the helpers has no side effects)
+        os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+        os.makedirs(HTML_DUMP_DIR, exist_ok=True)
+
+        # Per-config logs are built in memory, so the file only sees one write (and flush) per VPN
+        with open(RESULTS_FILE, 'w', buffering=64 * 1024) as f_results, contextlib.ExitStack() as cleanup:
             log_message("Starting DNB Scraper Troubleshooting...", f_results)
             log_message(f"Home URL: {DNB_HOME_URL}", f_results)
             log_message(f"Target URL: {TARGET_DNB_URL}", f_results)
-            log_message(f"Testing {len(WIREGUARD_CONFIG_FILES_TO_TEST)} VPNs.", f_results)
+            config_files = WIREGUARD_CONFIG_FILES_TO_TEST[:MAX_VPNS]
+            log_message(f"Testing {len(config_files)} VPNs.", f_results)
 
-            for config_file in WIREGUARD_CONFIG_FILES_TO_TEST:
-                log_message(f"\nTesting VPN: {config_file}", f_results)
-                f_results.write(f"\n--- VPN: {config_file} ---\n")
-                
-                if not bring_up_vpn(config_file, f_results):
-                    log_message(f"Skipping {config_file}.", f_results)
-                    f_results.write("  VPN Failed.\n")
-                    continue
+            # Runs in reverse on exit: close the browser, finish pending screenshot/HTML writes, close the zips
+            cleanup.callback(_close_html_zips)
+            cleanup.callback(_IO_POOL.shutdown, wait=True)
 
-                try:
-                    # Setup browser with stealth
-                    user_agents = [
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0",
-                        "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6; rv:128.0) Gecko/20100101 Firefox/128.0",
-                        "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
-                    ]
-                    firefox_options = Options()
-                    firefox_options.add_argument(f"--user-agent={random.choice(user_agents)}")
-                    firefox_options.add_argument(f"--width={random.randint(1280, 1920)}")
-                    firefox_options.add_argument(f"--height={random.randint(720, 1080)}")
-                    self.set_browser_options(firefox_options)
-
-                    # Launch browser
-                    self.setUp(browser="firefox")
-
-                    # Stealth script to mimic human browser
-                    self.execute_script("""
-                        Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-                        Object.defineProperty(window, 'chrome', { get: () => undefined });
-                        Object.defineProperty(navigator, 'plugins', {
-                            get: () => [
-                                { name: 'PDF Viewer', filename: 'internal-pdf-viewer', description: 'Portable Document Format', length: 1 },
-                                { name: 'Widevine CDM', filename: 'widevinecdm.dll', description: 'Enables secure playback', length: 1 },
-                            ],
-                        });
-                        Object.defineProperty(navigator, 'mimeTypes', {
-                            get: () => [{ type: 'application/pdf', suffixes: 'pdf', description: 'Portable Document Format', enabledPlugin: navigator.plugins[0] }],
-                        });
-                        Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
-                        Object.defineProperty(navigator, 'hardwareConcurrency', { get: () => [4, 8, 12][Math.floor(Math.random() * 3)] });
-                        Object.defineProperty(navigator, 'deviceMemory', { get: () => [4, 8, 16][Math.floor(Math.random() * 3)] });
-                        Object.defineProperty(window, 'outerWidth', { get: () => window.innerWidth });
-                        Object.defineProperty(window, 'outerHeight', { get: () => window.innerHeight });
-                        Object.defineProperty(navigator, 'platform', { get: () => ['Win32', 'MacIntel', 'Linux x86_64'][Math.floor(Math.random() * 3)] });
-                        console.debug = () => {};
-
-                        const getParameter = WebGLRenderingContext.prototype.getParameter;
-                        WebGLRenderingContext.prototype.getParameter = function(parameter) {
-                            if (parameter === 37445) return 'Mozilla';
-                            if (parameter === 37446) return ['ANGLE (NVIDIA GeForce RTX 3060)', 'ANGLE (Intel Iris Xe)', 'ANGLE (AMD Radeon)'][Math.floor(Math.random() * 3)];
-                            return getParameter.apply(this, arguments);
-                        };
-
-                        const getContext = HTMLCanvasElement.prototype.getContext;
-                        HTMLCanvasElement.prototype.getContext = function(type) {
-                            if (type === '2d') {
-                                const ctx = getContext.apply(this, arguments);
-                                const originalGetImageData = ctx.getImageData;
-                                ctx.getImageData = function(x, y, w, h) {
-                                    const data = originalGetImageData.apply(this, arguments);
-                                    const pixels = data.data;
-                                    for (let i = 0; i < pixels.length; i += 4) pixels[i] += Math.floor(Math.random() * 3) - 1;
-                                    return data;
-                                };
-                                return ctx;
-                            }
-                            return getContext.apply(this, arguments);
-                        };
-
-                        Object.defineProperty(navigator, 'connection', {
-                            get: () => ({
-                                effectiveType: '4g',
-                                rtt: Math.floor(Math.random() * 50) + 50,
-                                downlink: Math.random() * 4 + 4,
-                                saveData: false,
-                            }),
-                        });
-
-                        Object.defineProperty(window, 'screen', {
-                            get: () => ({
-                                width: window.innerWidth,
-                                height: window.innerHeight,
-                                availWidth: window.innerWidth,
-                                availHeight: window.innerHeight,
-                                colorDepth: 24,
-                                pixelDepth: 24,
-                            }),
-                        });
-                    """)
-
-                    # Navigate to DNB Home
-                    delay = random.uniform(5, 10)
-                    log_message(f"Waiting {delay:.2f}s for home URL...", f_results)
-                    time.sleep(delay)
-
-                    # Simulate human-like behavior
-                    try:
-                        steps, delay_ms_range = 5, (30, 100)
-                        log_message(f"Simulating mouse ({steps} steps)...", f_results)
-                        for _ in range(steps):
-                            self.js_click_at(random.randint(50, 1200), random.randint(50, 900))
-                            time.sleep(random.uniform(*delay_ms_range) / 1000)
-                        log_message("Mouse done.", f_results)
-
-                        scroll_attempts, scroll_amount_range, scroll_delay_range = 3, (200, 600), (0.5, 2)
-                        log_message(f"Simulating scroll ({scroll_attempts} attempts)...", f_results)
-                        for _ in range(scroll_attempts):
-                            scroll_amount = random.randint(*scroll_amount_range) * random.choice([1, -1])
-                            self.execute_script(f"window.scrollBy(0, {scroll_amount});")
-                            time.sleep(random.uniform(*scroll_delay_range))
-                        log_message("Scroll done.", f_results)
-                    except Exception as e:
-                        log_message(f"Behavior simulation error: {e}", f_results)
+            # Firefox is launched once; new sockets follow whichever tunnel is up.
+            try:
+                self._start_browser()
+            except Exception as e:
+                log_message(f"Browser error: {e}", f_results)
+                f_results.write("  Status: FAILED - Browser Error\n")
+                return
+            cleanup.callback(self._close_browser, f_results)
 
-                    log_message(f"Navigating to {DNB_HOME_URL}...", f_results)
-                    try:
-                        self.open(DNB_HOME_URL)
-                        self.wait_for_ready_state_complete(timeout=30)
-                        title = self.get_page_title()
-                        log_message(f"Navigated to {DNB_HOME_URL}. Title: {title}", f_results)
-                        dump_html_content(self.driver, "dnb_home_page_content", config_file, f_results)
-                        block_detected = self.is_element_present('iframe[src*="recaptcha"], #cf-wrapper, [data-hcaptcha-widget-id], h1:contains("Access Denied")')
-                        if block_detected:
-                            log_message("Block detected on home page!", f_results)
-                            take_screenshot(self.driver, "dnb_home_block_detected", config_file, f_results)
-                        f_results.write(f"  Home Page: SUCCESS{' (Block Detected)' if block_detected else ''}\n")
-                    except Exception as e:
-                        log_message(f"Error on {DNB_HOME_URL}: {e}", f_results)
-                        take_screenshot(self.driver, "dnb_home_error", config_file, f_results)
-                        dump_html_content(self.driver, "dnb_home_error_content", config_file, f_results)
-                        f_results.write(f"  Home Page: FAILED - {type(e).__name__}\n")
+            # Each config runs in isolation and hands back its own log. WireGuard
+            # tunnels share the host routing table, so configs still run one at a time.
+            for config_file in config_files:
+                result = self._test_one_config(config_file)
+                f_results.write(result["log"])
+                f_results.flush()
+                if STOP_ON_SUCCESS and result["home"] == result["target"] == "SUCCESS":
+                    log_message(f"Home and target reached without a block via {result['config_file']}; stopping.", f_results)
+                    break
 
-                    # Navigate to Target URL
-                    delay = random.uniform(3, 7)
-                    log_message(f"Waiting {delay:.2f}s for target URL...", f_results)
-                    time.sleep(delay)
+            log_message("Troubleshooting Done.", f_results)
 
-                    try:
-                        log_message(f"Simulating mouse ({steps} steps)...", f_results)
-                        for _ in range(steps):
-                            self.js_click_at(random.randint(50, 1200), random.randint(50, 900))
-                            time.sleep(random.uniform(*delay_ms_range) / 1000)
-                        log_message("Mouse done.", f_results)
-
-                        log_message(f"Simulating scroll ({scroll_attempts} attempts)...", f_results)
-                        for _ in range(scroll_attempts):
-                            scroll_amount = random.randint(*scroll_amount_range) * random.choice([1, -1])
-                            self.execute_script(f"window.scrollBy(0, {scroll_amount});")
-                            time.sleep(random.uniform(*scroll_delay_range))
-                        log_message("Scroll done.", f_results)
-                    except Exception as e:
-                        log_message(f"Behavior simulation error: {e}", f_results)
+    def run_in_namespace(self, config_file, result_path):
+        """Parallel-mode worker: tests one config whose tunnel is this process's only route."""
+        os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+        os.makedirs(HTML_DUMP_DIR, exist_ok=True)
+        with contextlib.ExitStack() as cleanup:
+            cleanup.callback(_close_html_zips)
+            cleanup.callback(_IO_POOL.shutdown, wait=True)
+            self._start_browser(cache_name=os.path.splitext(config_file)[0], one_tunnel=True)
+            cleanup.callback(self._close_browser, None)
+            result = self._test_one_config(config_file, manage_vpn=False)
+        with open(result_path, 'w') as f:
+            json.dump(result, f)
 
-                    log_message(f"Navigating to {TARGET_DNB_URL}...", f_results)
-                    try:
-                        self.open(TARGET_DNB_URL)
-                        self.wait_for_ready_state_complete(timeout=30)
-                        title = self.get_page_title()
-                        log_message(f"Navigated to {TARGET_DNB_URL}. Title: {title}", f_results)
-                        take_screenshot(self.driver, "dnb_target_page_loaded", config_file, f_results)
-                        dump_html_content(self.driver, "dnb_target_page_content", config_file, f_results)
-                        block_detected = self.is_element_present('iframe[src*="recaptcha"], #cf-wrapper, [data-hcaptcha-widget-id], h1:contains("Access Denied")')
-                        if block_detected:
-                            log_message("Block detected on target page!", f_results)
-                            take_screenshot(self.driver, "dnb_target_block_detected", config_file, f_results)
-                        f_results.write(f"  Target Page: SUCCESS{' (Block Detected)' if block_detected else ''}\n")
-                    except Exception as e:
-                        log_message(f"Error on {TARGET_DNB_URL}: {e}", f_results)
-                        take_screenshot(self.driver, "dnb_target_error", config_file, f_results)
-                        dump_html_content(self.driver, "dnb_target_error_content", config_file, f_results)
-                        f_results.write(f"  Target Page: FAILED - {type(e).__name__}\n")
+def troubleshoot_dnb_parallel():
+    """Runs every VPN config at the same time, each in its own network namespace."""
+    with open(RESULTS_FILE, 'w', buffering=64 * 1024) as f_results, tempfile.TemporaryDirectory() as result_dir:
+        log_message("Starting DNB Scraper Troubleshooting (parallel)...", f_results)
+        log_message(f"Home URL: {DNB_HOME_URL}", f_results)
+        log_message(f"Target URL: {TARGET_DNB_URL}", f_results)
+        config_files = WIREGUARD_CONFIG_FILES_TO_TEST[:MAX_VPNS]
+        log_message(f"Testing {len(config_files)} VPNs.", f_results)
 
-                    self.tearDown()
-                    log_message("Browser closed.", f_results)
+        # Start a worker per config; each is this script re-run inside the namespace as the current user
+        workers = []
+        for index, config_file in enumerate(config_files):
+            setup_log = io.StringIO()
+            namespace = setup_vpn_namespace(config_file, index, setup_log)
+            result_path = os.path.join(result_dir, f"{index}.json")
+            process = None
+            if namespace:
+                # sudo's env_reset would drop DNB_SIMULATE_HUMAN, so both hops keep it explicitly
+                keep_env = '--preserve-env=DNB_SIMULATE_HUMAN'
+                process = subprocess.Popen([
+                    'sudo', keep_env, 'ip', 'netns', 'exec', namespace, 'sudo', keep_env, '-u', getpass.getuser(),
+                    sys.executable, os.path.abspath(__file__), '--in-namespace', config_file, result_path,
+                ])
+            workers.append((config_file, namespace, setup_log, result_path, process))
 
-                except Exception as e:
-                    log_message(f"Browser error: {e}", f_results)
-                    f_results.write(f"  Status: FAILED - Browser Error\n")
-                finally:
-                    bring_down_vpn(config_file, f_results)
+        # Namespaces are independent, so each is torn down in the background while the next result is collected
+        teardowns = []
+        for config_file, namespace, setup_log, result_path, process in workers:
+            f_results.write(setup_log.getvalue())
+            if process is None:
+                f_results.write(f"\n--- VPN: {config_file} ---\n  VPN Failed.\n")
+            else:
+                process.wait()
+                try:
+                    with open(result_path) as f:
+                        f_results.write(json.load(f)["log"])
+                except (OSError, ValueError) as e:
+                    log_message(f"Worker for {config_file} exited {process.returncode} without a result: {e}", f_results)
+                    f_results.write(f"\n--- VPN: {config_file} ---\n  Status: FAILED - Browser Error\n")
+                teardowns.append(teardown_vpn_namespace(namespace, f_results, wait=False))
+            f_results.flush()
+        for teardown in teardowns:
+            _wait_teardown(teardown)
 
-            log_message("Troubleshooting Done.", f_results)
+        log_message("Troubleshooting Done.", f_results)
 
 # Run the test
 if __name__ == "__main__":
-    DNBScraperTest().troubleshoot_dnb()
+    if len(sys.argv) == 4 and sys.argv[1] == "--in-namespace":
+        DNBScraperTest().run_in_namespace(sys.argv[2], sys.argv[3])
+    elif PARALLEL_VPNS:
+        troubleshoot_dnb_parallel()
+    else:
+        DNBScraperTest().troubleshoot_dnb()
@@ -1,5 +1,7 @@
 import requests
-from bs4 import BeautifulSoup
+import base64
+import configparser
+from bs4 import BeautifulSoup, SoupStrainer
 from urllib.parse import urljoin
 import re
 import time
@@ -8,11 +10,15 @@ import os
 import subprocess
 import random
 import socket
+import struct
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Import SeleniumBase components
 from seleniumbase import Driver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.expected_conditions import staleness_of
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import WebDriverException, TimeoutException, SessionNotCreatedException
 
 class DNBScraperSelenium:
@@ -29,10 +35,14 @@ class DNBScraperSelenium:
             'windows.net', 'azureedge.net', 'msecnd.net'
         ]
         self.processed_domains = set()
+        self.mx_cache = {} # domain -> is_microsoft, shared across VPN configs
+        # MX lookups run here while the browser moves on to the next company page
+        self.mx_pool = ThreadPoolExecutor(max_workers=4)
         self.start_time = time.time()
         self.failed_pages = set()
         self.driver = None # Selenium WebDriver instance
         self.current_vpn_config_file = None # To track which VPN config is currently active
+        self.resolver = None # DNS resolver for the active tunnel, built once per VPN bring-up
 
         # List of your Mullvad WireGuard config files.
         # These files are expected to be in the same directory as this script.
@@ -41,9 +51,19 @@ class DNBScraperSelenium:
             "us-phx-wg-101.conf", "us-phx-wg-103.conf", "us-phx-wg-202.conf",
             "us-sjc-wg-002.conf", "us-sjc-wg-302.conf", "us-sjc-wg-504.conf",
         ]
+        # Absolute paths resolved once, so later cwd changes can't redirect wg-quick
+        self.config_paths = {c: os.path.abspath(c) for c in self.WIREGUARD_CONFIG_FILES}
         self.results_file = "scraper_results.txt"
-        self.vpn_setup_wait_time = 5 # seconds to wait after bringing up VPN
+        self.vpn_setup_wait_time = 5 # max seconds to wait for the first WireGuard handshake
         self.screenshot_dir = "screenshots" # Directory to save screenshots
+        # Persistent Chrome profile: the HTTP cache survives across configs and runs (cookies and DNB's site storage are still cleared per config)
+        self.profile_dir = os.path.join(os.getcwd(), "chrome_profile")
+        # Only the HTML is scraped, so skip fonts, stylesheets and media (images are blocked via Driver)
+        self.blocked_url_patterns = [
+            "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css",
+            "*.mp4", "*.webm", "*.mp3", "*.m3u8",
+        ]
+        self.dnb_origin = "https://www.dnb.com"
 
         # Ensure screenshot directory exists
         os.makedirs(self.screenshot_dir, exist_ok=True)
@@ -102,20 +122,23 @@ class DNBScraperSelenium:
 
     def check_mx_records(self, domain):
         """Checks if a domain's MX records indicate Microsoft affiliation."""
+        if domain in self.mx_cache:
+            self.log(f"MX lookup for {domain}: cached result")
+            return self.mx_cache[domain]
+        is_microsoft = self._lookup_mx_records(domain)
+        if is_microsoft is None:
+            return False # Transient failure; don't cache so the next config retries
+        self.mx_cache[domain] = is_microsoft
+        return is_microsoft
+
+    def _lookup_mx_records(self, domain):
+        """Resolves a domain's MX records and matches them against the Microsoft patterns."""
         try:
             start_time = time.time()
-            resolver = dns.resolver.Resolver()
-            # Set a timeout for DNS queries
-            resolver.timeout = 5
-            resolver.lifetime = 5
-            mx_records = resolver.resolve(domain, 'MX')
+            mx_records = self.resolver.resolve(domain, 'MX')
             mx_strings = [str(mx.exchange).rstrip('.').lower() for mx in mx_records]
-            microsoft_found = []
-            for mx in mx_strings:
-                for pattern in self.microsoft_patterns:
-                    if pattern in mx or mx.endswith('.' + pattern):
-                        microsoft_found.append(mx)
-                        break
+            # A suffix match implies a substring match, so one C-level containment test per pattern suffices
+            microsoft_found = [mx for mx in mx_strings if any(map(mx.__contains__, self.microsoft_patterns))]
             is_microsoft = len(microsoft_found) > 0
             self.log(f"MX lookup for {domain}: {'Microsoft affiliated' if is_microsoft else 'Not Microsoft'}",
                      time.time() - start_time)
@@ -130,10 +153,10 @@ class DNBScraperSelenium:
             return False
         except dns.resolver.Timeout:
             self.log(f"MX lookup for {domain}: DNS query timed out.")
-            return False
+            return None
         except Exception as e:
             self.log(f"MX lookup failed for {domain}: {str(e)}")
-            return False
+            return None
 
     def is_microsoft_affiliated(self, website):
         """Determines if a website is Microsoft affiliated based on MX records."""
@@ -147,7 +170,7 @@ class DNBScraperSelenium:
 
     def bring_up_vpn(self, config_file):
         """Brings up a WireGuard VPN tunnel using wg-quick."""
-        config_path = os.path.join(os.getcwd(), config_file)
+        config_path = self.config_paths[config_file]
         self.log(f"Attempting to bring up WireGuard tunnel with '{config_file}'...")
         # Use sudo as wg-quick typically requires root privileges to manage network interfaces.
         up_command = ['sudo', 'wg-quick', 'up', config_path]
@@ -156,17 +179,82 @@ class DNBScraperSelenium:
         if up_process.returncode != 0:
             self.log(f"Error bringing up VPN: {up_process.stderr.strip()}")
             return False
-        self.log(f"VPN tunnel for '{config_file}' brought up successfully. Waiting {self.vpn_setup_wait_time} seconds...")
-        time.sleep(self.vpn_setup_wait_time)
+        self.log(f"VPN tunnel for '{config_file}' brought up successfully. Waiting for handshake...")
         self.current_vpn_config_file = config_file
+        start_wait = time.time()
+        if self.wait_for_handshake(config_path):
+            self.log("WireGuard handshake completed.", time.time() - start_wait)
+        else:
+            self.log(f"No WireGuard handshake within {self.vpn_setup_wait_time} seconds; continuing anyway.")
+        # wg-quick has just rewritten resolv.conf with the tunnel's DNS; read it once for this VPN
+        self.resolver = dns.resolver.Resolver()
+        # Set a timeout for DNS queries
+        self.resolver.timeout = 5
+        self.resolver.lifetime = 5
         return True
 
+    def wait_for_handshake(self, config_path):
+        """Polls 'wg show' until the tunnel's peer reports a handshake, up to vpn_setup_wait_time."""
+        interface = os.path.splitext(os.path.basename(config_path))[0] # wg-quick names the interface after the file
+        conf = configparser.ConfigParser(strict=False)
+        conf.read(config_path)
+        dns_server = conf.get('Interface', 'DNS', fallback='').split(',')[0].strip()
+        deadline = time.time() + self.vpn_setup_wait_time
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as kick:
+            while time.time() < deadline:
+                # WireGuard only handshakes once there is traffic; an empty datagram is enough
+                if dns_server:
+                    try:
+                        kick.sendto(b'', (dns_server, 53))
+                    except OSError:
+                        pass
+                show = subprocess.run(['sudo', 'wg', 'show', interface, 'latest-handshakes'],
+                                      capture_output=True, text=True, check=False)
+                # One "<peer public key>\t<unix time>" line per peer; 0 means no handshake yet
+                if any(line.split('\t')[-1] not in ('', '0') for line in show.stdout.splitlines()):
+                    return True
+                time.sleep(0.2)
+        return False
+
+    def get_public_ip_via_stun(self, server=("stun.l.google.com", 19302), timeout=2.0):
+        """Returns the public IPv4 address seen by a STUN server, or None if it can't be determined."""
+        magic_cookie = 0x2112A442
+        transaction_id = os.urandom(12)
+        # Binding Request: type 0x0001, no attributes
+        request = struct.pack("!HHI", 0x0001, 0, magic_cookie) + transaction_id
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.settimeout(timeout)
+                sock.sendto(request, server)
+                response, _ = sock.recvfrom(2048)
+        except OSError as e:
+            self.log(f"STUN query to {server[0]} failed: {e}")
+            return None
+
+        if len(response) < 20 or response[8:20] != transaction_id:
+            return None
+        msg_type, msg_length = struct.unpack("!HH", response[:4])
+        if msg_type != 0x0101: # Binding Success Response
+            return None
+        offset, end = 20, min(20 + msg_length, len(response))
+        while offset + 4 <= end:
+            attr_type, attr_length = struct.unpack("!HH", response[offset:offset + 4])
+            value = response[offset + 4:offset + 4 + attr_length]
+            # XOR-MAPPED-ADDRESS (0x0020) or the legacy MAPPED-ADDRESS (0x0001), IPv4 family only
+            if attr_type in (0x0020, 0x0001) and len(value) >= 8 and value[1] == 0x01:
+                address = struct.unpack("!I", value[4:8])[0]
+                if attr_type == 0x0020:
+                    address ^= magic_cookie
+                return socket.inet_ntoa(struct.pack("!I", address))
+            offset += 4 + attr_length + (-attr_length % 4) # Attributes are padded to 4 bytes
+        return None
+
     def bring_down_vpn(self):
         """Brings down the currently active WireGuard VPN tunnel."""
         if not self.current_vpn_config_file:
             return # No VPN is currently active
         
-        config_path = os.path.join(os.getcwd(), self.current_vpn_config_file)
+        config_path = self.config_paths[self.current_vpn_config_file]
         self.log(f"Attempting to bring down WireGuard tunnel for '{self.current_vpn_config_file}'...")
         down_command = ['sudo', 'wg-quick', 'down', config_path]
         down_process = subprocess.run(down_command, capture_output=True, text=True, check=False)
@@ -181,8 +269,11 @@ class DNBScraperSelenium:
         """Initializes the SeleniumBase WebDriver."""
         # FIX: Changed "chromium" to "chrome" as per SeleniumBase valid options
         try:
-            self.driver = Driver(browser="chrome", headless=True) # Use "chrome" for Chromium
-            self.driver.set_page_load_timeout(60) # Set page load timeout to 60 seconds
+            # "none" returns as soon as navigation starts; load_page() decides when the new page is usable
+            self.driver = Driver(browser="chrome", headless=True, block_images=True, page_load_strategy="none", user_data_dir=self.profile_dir) # Use "chrome" for Chromium
+            self.driver.set_page_load_timeout(20) # Set page load timeout to 20 seconds
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_url_patterns})
             self.log("Selenium WebDriver initialized successfully in headless mode!")
             return True
         except SessionNotCreatedException as e:
@@ -208,55 +299,95 @@ class DNBScraperSelenium:
             self.driver = None
             self.log("Selenium WebDriver quit.")
 
+    def reset_browser_session(self):
+        """Clears cookies and DNB's site storage so the next VPN config starts with a fresh identity."""
+        try:
+            self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            # The profile persists on disk, so storage would otherwise follow us across exit IPs and runs
+            self.driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                "origin": self.dnb_origin,
+                "storageTypes": "local_storage,indexeddb,service_workers,cache_storage",
+            })
+            self.driver.get("about:blank")
+        except WebDriverException as e:
+            self.log(f"Error resetting browser session: {e}")
+
+    def load_page(self, url, css_selector, parsed=False, timeout=15):
+        """Navigates to url and waits until css_selector is in the new DOM, or the page finished loading without it.
+
+        get() can return before the new document commits, so the previous page's <html> must go stale
+        first (this also follows redirects). parsed=True additionally waits until the initial HTML is
+        fully parsed, for pages where every match is needed rather than just the first.
+        """
+        old_root = self.driver.find_element(By.TAG_NAME, "html")
+        self.driver.get(url)
+        wait = WebDriverWait(self.driver, timeout, poll_frequency=0.1)
+        wait.until(staleness_of(old_root))
+        wait.until(
+            lambda d: d.execute_script(
+                "return (!arguments[1] || document.readyState !== 'loading')"
+                " && (document.querySelector(arguments[0]) !== null || document.readyState === 'complete');",
+                css_selector, parsed,
+            )
+        )
+
     def take_screenshot(self, filename_suffix):
-        """Takes a screenshot and saves it to the screenshots directory."""
+        """Saves a viewport JPEG (quality 60) to the screenshots directory; used on failure paths only."""
         if self.driver:
-            screenshot_name = f"{self.current_vpn_config_file.replace('.conf', '')}_{filename_suffix}_{datetime.now().strftime('%H%M%S')}.png"
+            screenshot_name = f"{self.current_vpn_config_file.replace('.conf', '')}_{filename_suffix}_{datetime.now().strftime('%H%M%S')}.jpg"
             screenshot_path = os.path.join(self.screenshot_dir, screenshot_name)
             try:
-                self.driver.save_screenshot(screenshot_path)
+                shot = self.driver.execute_cdp_cmd("Page.captureScreenshot", {"format": "jpeg", "quality": 60})
+                with open(screenshot_path, 'wb') as f:
+                    f.write(base64.b64decode(shot['data']))
                 self.log(f"Screenshot saved: {screenshot_path}")
             except Exception as e:
                 self.log(f"Error taking screenshot {screenshot_name}: {e}")
 
     def scrape_company_websites(self, url, page_number):
-        """Scrapes company websites from a given D&B page using SeleniumBase."""
+        """Scrapes company websites from a given D&B page using SeleniumBase.
+
+        Returns (website, future) pairs; each future resolves to the website's
+        Microsoft affiliation and is started as soon as the website is found.
+        """
         websites = []
         try:
             start_task = time.time()
             self.log(f"Navigating to D&B page: {url}")
-            self.driver.get(url) # Navigate using SeleniumBase
-            
-            # Take a screenshot after navigating to the page
-            self.take_screenshot(f"page_{page_number}")
-
-            # Get page source after navigation
-            content = self.driver.page_source
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Find links to individual company profiles
-            company_links = soup.find_all('a', href=lambda x: x and '/business-directory/company-profiles.' in x)
+            # The links are in the initial HTML, so wait for the whole of it before collecting them
+            self.load_page(url, "a[href*='/business-directory/company-profiles.']", parsed=True)
+
+            # Filter links to individual company profiles in the browser; only the hrefs come back
+            company_links = self.driver.execute_script(
+                "return Array.from(document.querySelectorAll(arguments[0]), a => a.getAttribute('href'));",
+                "a[href*='/business-directory/company-profiles.']",
+            )
             self.log(f"Found {len(company_links)} company profile links on this page", time.time() - start_task)
 
             if not company_links:
-                self.log(f"No company links found on {url}. Page source snippet:\n{content[:1000]}...") # Log snippet if no links
+                # Slice in the browser so only the snippet crosses the WebDriver connection
+                snippet = self.driver.execute_script("return document.documentElement.outerHTML.slice(0, 1000);")
+                self.log(f"No company links found on {url}. Page source snippet:\n{snippet}...") # Log snippet if no links
+                self.take_screenshot(f"page_{page_number}")
             
-            for idx, link in enumerate(company_links, 1):
+            for idx, href in enumerate(company_links, 1):
                 link_start = time.time()
-                company_page_url = urljoin(url, link['href'])
+                company_page_url = urljoin(url, href)
                 self.log(f"Processing company profile link {idx}/{len(company_links)}: {company_page_url}")
                 website = self.get_company_website(company_page_url)
                 if website:
                     self.log(f"Found company website: {website}", time.time() - link_start)
-                    websites.append(website)
+                    websites.append((website, self.mx_pool.submit(self.is_microsoft_affiliated, website)))
                 else:
                     self.log(f"No website found for company page", time.time() - link_start)
             return websites
         except TimeoutException:
             self.log(f"Navigation to {url} timed out.")
+            self.take_screenshot(f"page_{page_number}_timeout")
             return []
         except WebDriverException as e:
             self.log(f"WebDriver error while scraping {url}: {e}")
+            self.take_screenshot(f"page_{page_number}_error")
             return []
         except Exception as e:
             self.log(f"Error scraping {url}: {e}")
@@ -267,13 +398,11 @@ class DNBScraperSelenium:
         try:
             start_time = time.time()
             self.log(f"Navigating to company detail page: {company_page_url}")
-            self.driver.get(company_page_url) # Navigate using SeleniumBase
-            
-            # Take a screenshot of the company detail page
-            self.take_screenshot(f"company_{os.path.basename(company_page_url).split('.')[0]}")
+            self.load_page(company_page_url, "a#hero-company-link")
 
             content = self.driver.page_source
-            soup = BeautifulSoup(content, 'html.parser')
+            # lxml builds the tree in C; the strainer keeps only the one anchor we read
+            soup = BeautifulSoup(content, 'lxml', parse_only=SoupStrainer('a', id='hero-company-link'))
 
             # Find the website link element (assuming it has id='hero-company-link')
             website_element = soup.find('a', id='hero-company-link')
@@ -285,9 +414,11 @@ class DNBScraperSelenium:
                 result = clean_url
             else:
                 self.log(f"Website element (id='hero-company-link') not found on {company_page_url}. Page source snippet:\n{content[:1000]}...")
+                self.take_screenshot(f"company_{os.path.basename(company_page_url).split('.')[0]}")
             return result
         except TimeoutException:
             self.log(f"Navigation to {company_page_url} timed out.")
+            self.take_screenshot(f"company_{os.path.basename(company_page_url).split('.')[0]}_timeout")
             return None
         except WebDriverException as e:
             self.log(f"WebDriver error while getting company website from {company_page_url}: {e}")
@@ -309,104 +440,113 @@ class DNBScraperSelenium:
             self.log("No URLs to process. Exiting.")
             return
 
-        MAX_PAGES = 20
-        MAX_RETRIES = 3 # Maximum number of retries for failed pages
-
         # Open results file once at the beginning to write all results
-        with open(self.results_file, 'w') as f_results:
+        # Large buffer, explicit codec: many small writes per page, flushed once per config
+        with open(self.results_file, 'w', buffering=1 << 20, encoding='utf-8', newline='') as f_results:
             f_results.write(f"--- DNB Scraper Run: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---\n\n")
 
-            for config_file in self.WIREGUARD_CONFIG_FILES:
-                self.log(f"\n--- Starting scraping with WireGuard config: {config_file} ---")
-                f_results.write(f"\n--- WireGuard Config: {config_file} ---\n")
-
-                if not self.bring_up_vpn(config_file):
-                    self.log(f"Skipping config {config_file} due to VPN setup failure.")
-                    f_results.write(f"  VPN Setup Failed. Skipping this config.\n\n")
-                    continue
-
-                # Initialize driver *after* VPN is up so it uses the VPN tunnel
-                if not self.initialize_driver(): # Check if driver initialization was successful
-                    self.log(f"Could not initialize browser for {config_file}. Skipping this config.")
-                    f_results.write(f"  Browser Initialization Failed. Skipping this config.\n\n")
-                    self.bring_down_vpn() # Attempt to bring down VPN even if browser failed
-                    continue
-
-                try:
-                    # Test current IP through the VPN using Selenium to confirm connectivity
-                    self.driver.get("https://ifconfig.me/ip")
-                    # FIX: Parse the IP from the HTML response
-                    ip_soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-                    current_ip = ip_soup.find('pre').text.strip() if ip_soup.find('pre') else "IP not found in <pre> tag"
-                    
-                    self.log(f"Current Public IP through VPN: {current_ip}")
-                    f_results.write(f"  Public IP through VPN: {current_ip}\n")
-
-                    # Now, run the actual scraping logic for this VPN
-                    for base_url, count, start_page in urls_with_counts:
-                        ms_count = 0
-                        target_count = int(count)
-                        page_number = start_page
-                        last_successful_page = page_number - 1
-                        retry_count = 0
-                        self.log(f"Starting to process URL: {base_url} for {target_count} Microsoft-affiliated sites.")
-                        f_results.write(f"  Processing URL: {base_url} (Target: {target_count} MS sites)\n")
-
-                        while ms_count < target_count and page_number <= MAX_PAGES:
-                            current_url = self.get_paginated_url(base_url, page_number)
-                            self.log(f"Scraping page {page_number}/{MAX_PAGES}: {current_url}")
-                            
-                            websites = self.scrape_company_websites(current_url, page_number) # Pass page_number for screenshot naming
-
-                            if websites:
-                                # If this page has data but we skipped some pages, go back and retry
-                                if page_number > last_successful_page + 1 and retry_count < MAX_RETRIES:
-                                    retry_pages = list(range(last_successful_page + 1, page_number))
-                                    self.log(f"Found data on page {page_number} but missed pages {retry_pages}. Retrying from {last_successful_page + 1}...")
-                                    page_number = last_successful_page + 1
-                                    retry_count += 1
-                                    continue # Re-enter loop to process the missed page
-
-                                last_successful_page = page_number
-                                retry_count = 0  # Reset retry counter on success
-                                
-                                for website in websites:
-                                    if website and not self.is_domain_processed(website):
-                                        if self.is_microsoft_affiliated(website):
-                                            if self.add_domain(website):
-                                                ms_count += 1
-                                                self.log(f"Found Microsoft-affiliated website ({ms_count}/{target_count}): {website}")
-                                                f_results.write(f"    Found MS-affiliated: {website}\n")
-                                            if ms_count >= target_count:
-                                                break # Found enough for this URL
-                            else:
-                                self.log(f"No companies found on page {page_number}.")
-                                f_results.write(f"    No companies found on page {page_number}.\n")
-                                self.failed_pages.add(page_number)
-
-                            if ms_count >= target_count:
-                                break # Found enough for this URL
-                            page_number += 1
-
-                        if ms_count < target_count:
-                            self.log(f"Could only find {ms_count} Microsoft-affiliated websites out of {target_count} requested for {base_url}")
-                            f_results.write(f"  Finished {base_url}. Found {ms_count}/{target_count} MS-affiliated sites.\n")
-                        else:
-                            self.log(f"Successfully found {ms_count} Microsoft-affiliated websites for {base_url}.")
-                            f_results.write(f"  Finished {base_url}. Successfully found {ms_count} MS-affiliated sites.\n")
+            # One browser for all configs: Chrome opens new connections through whichever tunnel is up
+            if not self.initialize_driver():
+                self.log("Could not initialize browser. Exiting.")
+                f_results.write("Browser Initialization Failed.\n")
+                return
 
-                        if self.failed_pages:
-                            self.log(f"Failed to process pages for {base_url}: {sorted(self.failed_pages)}")
-                            f_results.write(f"  Failed pages for {base_url}: {sorted(self.failed_pages)}\n")
-                        self.failed_pages.clear() # Clear for next URL/config
-                    f_results.write("\n") # Add a newline for readability between configs
-
-                finally:
-                    self.quit_driver() # Quit driver before bringing down VPN
-                    self.bring_down_vpn() # Bring down VPN after scraping with it
+            try:
+                self.scrape_all_configs(urls_with_counts, f_results)
+            finally:
+                self.mx_pool.shutdown(wait=True)
+                self.quit_driver()
 
             self.log(f"All scraping tests completed. Results saved to '{self.results_file}'.")
 
+    def scrape_all_configs(self, urls_with_counts, f_results):
+        """Runs the scraping logic once per WireGuard config, reusing the open browser."""
+        MAX_PAGES = 20
+        MAX_RETRIES = 3 # Maximum number of retries for failed pages
+
+        for config_file in self.WIREGUARD_CONFIG_FILES:
+            self.log(f"\n--- Starting scraping with WireGuard config: {config_file} ---")
+            f_results.write(f"\n--- WireGuard Config: {config_file} ---\n")
+
+            if not self.bring_up_vpn(config_file):
+                self.log(f"Skipping config {config_file} due to VPN setup failure.")
+                f_results.write(f"  VPN Setup Failed. Skipping this config.\n\n")
+                continue
+
+            try:
+                self.reset_browser_session()
+
+                # Test current IP through the VPN with a single STUN round trip to confirm connectivity
+                current_ip = self.get_public_ip_via_stun() or "IP not found via STUN"
+
+                self.log(f"Current Public IP through VPN: {current_ip}")
+                f_results.write(f"  Public IP through VPN: {current_ip}\n")
+
+                # Now, run the actual scraping logic for this VPN
+                for base_url, count, start_page in urls_with_counts:
+                    ms_count = 0
+                    target_count = int(count)
+                    page_number = start_page
+                    last_successful_page = page_number - 1
+                    retry_count = 0
+                    self.log(f"Starting to process URL: {base_url} for {target_count} Microsoft-affiliated sites.")
+                    f_results.write(f"  Processing URL: {base_url} (Target: {target_count} MS sites)\n")
+
+                    while ms_count < target_count and page_number <= MAX_PAGES:
+                        current_url = self.get_paginated_url(base_url, page_number)
+                        self.log(f"Scraping page {page_number}/{MAX_PAGES}: {current_url}")
+                        
+                        websites = self.scrape_company_websites(current_url, page_number) # Pass page_number for screenshot naming
+
+                        if websites:
+                            # If this page has data but we skipped some pages, go back and retry
+                            if page_number > last_successful_page + 1 and retry_count < MAX_RETRIES:
+                                retry_pages = list(range(last_successful_page + 1, page_number))
+                                self.log(f"Found data on page {page_number} but missed pages {retry_pages}. Retrying from {last_successful_page + 1}...")
+                                page_number = last_successful_page + 1
+                                retry_count += 1
+                                continue # Re-enter loop to process the missed page
+
+                            last_successful_page = page_number
+                            retry_count = 0  # Reset retry counter on success
+                            
+                            for website, is_microsoft in websites:
+                                if website and not self.is_domain_processed(website):
+                                    if is_microsoft.result():
+                                        if self.add_domain(website):
+                                            ms_count += 1
+                                            self.log(f"Found Microsoft-affiliated website ({ms_count}/{target_count}): {website}")
+                                            f_results.write(f"    Found MS-affiliated: {website}\n")
+                                        if ms_count >= target_count:
+                                            break # Found enough for this URL
+                            for _, is_microsoft in websites:
+                                is_microsoft.cancel() # Drop lookups still queued after an early break
+                        else:
+                            self.log(f"No companies found on page {page_number}.")
+                            f_results.write(f"    No companies found on page {page_number}.\n")
+                            self.failed_pages.add(page_number)
+
+                        if ms_count >= target_count:
+                            break # Found enough for this URL
+                        page_number += 1
+
+                    if ms_count < target_count:
+                        self.log(f"Could only find {ms_count} Microsoft-affiliated websites out of {target_count} requested for {base_url}")
+                        f_results.write(f"  Finished {base_url}. Found {ms_count}/{target_count} MS-affiliated sites.\n")
+                    else:
+                        self.log(f"Successfully found {ms_count} Microsoft-affiliated websites for {base_url}.")
+                        f_results.write(f"  Finished {base_url}. Successfully found {ms_count} MS-affiliated sites.\n")
+
+                    if self.failed_pages:
+                        self.log(f"Failed to process pages for {base_url}: {sorted(self.failed_pages)}")
+                        f_results.write(f"  Failed pages for {base_url}: {sorted(self.failed_pages)}\n")
+                    self.failed_pages.clear() # Clear for next URL/config
+                f_results.write("\n") # Add a newline for readability between configs
+
+            finally:
+                f_results.flush() # Make each config's results visible without per-line syscalls
+                self.bring_down_vpn() # Bring down VPN after scraping with it
+
 if __name__ == "__main__":
     scraper = DNBScraperSelenium()
     scraper.main()